@@ -1,4 +1,4 @@
-from .base_client import BaseLLMClient, BaseLLMClientAsync, CachedLLMClient, CachedLLMClientAsync
+from .base_client import BaseLLMClient, BaseLLMClientAsync, CachedLLMClient, CachedLLMClientAsync, clear_defaults_cache
 from .types import Completion, Message, Choice, Usage, Response, Candidate, Content, Part, UsageMetadata, Tool, ToolConfig, ThinkingConfig, FunctionCall, FunctionDeclaration
 from .main import get_client, get_async_client, configure, sync_existing_clients_with_global_config, get_models_list
 from .utils import DecoratorConfigs, RpmLimitConfig, RetryConfig
@@ -2,10 +2,19 @@ import re
 import json
 import os
 import hashlib
+import threading
+import asyncio
 import logging
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache, cache
 from typing import Iterator, AsyncIterator, Literal, overload
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from promptbuilder.llm_client.types import Response, Content, Part, Tool, ToolConfig, FunctionCall, FunctionCallingConfig, Json, ThinkingConfig, ApiKey, PydanticStructure, ResultType, FinishReason
 import promptbuilder.llm_client.utils as utils
 import promptbuilder.llm_client.logfire_decorators as logfire_decorators
@@ -14,6 +23,33 @@ from promptbuilder.llm_client.config import GLOBAL_CONFIG
 
 logger = logging.getLogger(__name__)
 
+_CODE_BLOCK_RE = re.compile(r"```(?:json\s)?(.*)```", re.DOTALL)
+
+# Tool configs shared by all create_value calls, the clients only read them
+_TOOL_CFG_NONE = ToolConfig(function_calling_config=FunctionCallingConfig(mode="NONE"))
+_TOOL_CFG_ANY = ToolConfig(function_calling_config=FunctionCallingConfig(mode="ANY"))
+
+
+@cache
+def _resolve_defaults(full_model_name: str) -> tuple[utils.DecoratorConfigs | None, ThinkingConfig | None, int | None]:
+    # GLOBAL_CONFIG defaults for a model, call clear_defaults_cache() after changing GLOBAL_CONFIG
+    return (
+        GLOBAL_CONFIG.default_decorator_configs.get(full_model_name),
+        GLOBAL_CONFIG.default_thinking_configs.get(full_model_name),
+        GLOBAL_CONFIG.default_max_tokens.get(full_model_name),
+    )
+
+
+def clear_defaults_cache():
+    """Forget the cached per-model defaults, must be called after GLOBAL_CONFIG is changed directly"""
+    _resolve_defaults.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def _wrap_user_prompt(prompt: str) -> Content:
+    # The returned Content is shared between calls and must not be mutated
+    return Content(parts=[Part(text=prompt)], role="user")
+
 class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
     provider: str
     
@@ -28,22 +64,23 @@ class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
     ):
         self.provider = provider
         self.model = model
+        full_model_name = f"{provider}:{model}"
+        self._full_model_name = full_model_name
+        global_decorator_configs, global_thinking_config, global_max_tokens = _resolve_defaults(full_model_name)
         
         if decorator_configs is None:
-            if self.full_model_name in GLOBAL_CONFIG.default_decorator_configs:
-                decorator_configs = GLOBAL_CONFIG.default_decorator_configs[self.full_model_name]
+            if global_decorator_configs is not None:
+                decorator_configs = global_decorator_configs
             else:
                 decorator_configs = utils.DecoratorConfigs()
         self._decorator_configs = decorator_configs
         
         if default_thinking_config is None:
-            if self.full_model_name in GLOBAL_CONFIG.default_thinking_configs:
-                default_thinking_config = GLOBAL_CONFIG.default_thinking_configs[self.full_model_name]
+            default_thinking_config = global_thinking_config
         self.default_thinking_config = default_thinking_config
         
         if default_max_tokens is None:
-            if self.full_model_name in GLOBAL_CONFIG.default_max_tokens:
-                default_max_tokens = GLOBAL_CONFIG.default_max_tokens[self.full_model_name]
+            default_max_tokens = global_max_tokens
         self.default_max_tokens = default_max_tokens
     
     @property
@@ -54,20 +91,25 @@ class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
     @property
     def full_model_name(self) -> str:
         """Return the model identifier"""
-        return self.provider + ":" + self.model
+        return self._full_model_name
     
     @staticmethod
     def as_json(text: str) -> Json:
         # Remove markdown code block formatting if present
         text = text.strip()
-                
-        code_block_pattern = r"```(?:json\s)?(.*)```"
-        match = re.search(code_block_pattern, text, re.DOTALL)
         
-        if match:
-            # Use the content inside code blocks
-            text = match.group(1).strip()
+        if "```" in text:
+            match = _CODE_BLOCK_RE.search(text)
+            if match:
+                # Use the content inside code blocks
+                text = match.group(1).strip()
 
+        try:
+            return orjson.loads(text) if orjson is not None else json.loads(text)
+        except json.JSONDecodeError:
+            pass
+        
+        # Fall back to lenient parsing for responses with raw control characters inside strings
         try:
             return json.loads(text, strict=False)
         except json.JSONDecodeError as e:
@@ -151,6 +193,15 @@ class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
         tool_choice_mode: Literal["ANY", "NONE"] = "NONE",
         autocomplete: bool = False,
     ):
+        if tool_choice_mode == "ANY":
+            tool_config = _TOOL_CFG_ANY
+        elif tool_choice_mode == "NONE":
+            tool_config = _TOOL_CFG_NONE
+        else:
+            tool_config = ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode))
+        if max_tokens is None:
+            max_tokens = self.default_max_tokens
+        
         if result_type == "tools":
             response = self.create(
                 messages=messages,
@@ -159,7 +210,7 @@ class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
                 system_message=system_message,
                 max_tokens=max_tokens,
                 tools=tools,
-                tool_config=ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode)),
+                tool_config=tool_config,
             )
             functions: list[FunctionCall] = []
             for candidate in response.candidates:
@@ -168,28 +219,20 @@ class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
                         functions.append(part.function_call)
             return functions
 
-        response = self.create(
-            messages=messages,
+        call_kwargs = dict(
             result_type=result_type,
             thinking_config=thinking_config,
             system_message=system_message,
             max_tokens=max_tokens,
             tools=tools,
-            tool_config=ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode)),
+            tool_config=tool_config,
         )
+        response = self.create(messages=messages, **call_kwargs)
 
         while autocomplete and response.candidates and response.candidates[0].finish_reason not in [FinishReason.STOP, FinishReason.MAX_TOKENS]:
             BaseLLMClient._append_generated_part(messages, response)
 
-            response = self.create(
-                messages=messages,
-                result_type=result_type,
-                thinking_config=thinking_config,
-                system_message=system_message,
-                max_tokens=max_tokens,
-                tools=tools,
-                tool_config=ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode)),
-            )
+            response = self.create(messages=messages, **call_kwargs)
 
         if result_type is None:
             return response.text
@@ -201,23 +244,29 @@ class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
 
     @staticmethod
     def _append_generated_part(messages: list[Content], response: Response):
-        assert(response.candidates and response.candidates[0].content), "Response must contain at least one candidate with content."
+        candidate = response.candidates[0] if response.candidates else None
+        content = candidate.content if candidate else None
+        if content is None:
+            raise ValueError("Response must contain at least one candidate with content.")
 
-        text_parts = [
-            part for part in response.candidates[0].content.parts if part.text is not None and not part.thought
-        ] if response.candidates[0].content and response.candidates[0].content.parts else None
-        if text_parts is not None and len(text_parts) > 0:
-            response_text = "".join(part.text for part in text_parts)
+        text_chunks: list[str] = []
+        thought_chunks: list[str] = []
+        for part in content.parts or []:
+            if part.text is None:
+                continue
+            if not part.thought:
+                text_chunks.append(part.text)
+            elif part.text:
+                thought_chunks.append(part.text)
+        
+        if text_chunks:
+            response_text = "".join(text_chunks)
             is_thought = False
+        elif thought_chunks:
+            response_text = "".join(thought_chunks)
+            is_thought = True
         else:
-            thought_parts = [
-                part for part in response.candidates[0].content.parts if part.text and part.thought
-            ] if response.candidates[0].content and response.candidates[0].content.parts else None
-            if thought_parts is not None and len(thought_parts) > 0:
-                response_text = "".join(part.text for part in thought_parts)
-                is_thought = True
-            else:
-                raise ValueError("No text or thought found in the response parts.")
+            raise ValueError("No text or thought found in the response parts.")
         
         if len(messages) > 0 and messages[-1].role == "model":
             message_to_append = messages[-1]
@@ -304,7 +353,7 @@ class BaseLLMClient(ABC, utils.InheritDecoratorsMixin):
         tool_choice_mode: Literal["ANY", "NONE"] = "NONE",
     ):
         return self.create_value(
-            messages=[Content(parts=[Part(text=prompt)], role="user")],
+            messages=[_wrap_user_prompt(prompt)],
             result_type=result_type,
             thinking_config=thinking_config,
             system_message=system_message,
@@ -328,22 +377,23 @@ class BaseLLMClientAsync(ABC, utils.InheritDecoratorsMixin):
     ):
         self.provider = provider
         self.model = model
+        full_model_name = f"{provider}:{model}"
+        self._full_model_name = full_model_name
+        global_decorator_configs, global_thinking_config, global_max_tokens = _resolve_defaults(full_model_name)
         
         if decorator_configs is None:
-            if self.full_model_name in GLOBAL_CONFIG.default_decorator_configs:
-                decorator_configs = GLOBAL_CONFIG.default_decorator_configs[self.full_model_name]
+            if global_decorator_configs is not None:
+                decorator_configs = global_decorator_configs
             else:
                 decorator_configs = utils.DecoratorConfigs()
         self._decorator_configs = decorator_configs
         
         if default_thinking_config is None:
-            if self.full_model_name in GLOBAL_CONFIG.default_thinking_configs:
-                default_thinking_config = GLOBAL_CONFIG.default_thinking_configs[self.full_model_name]
+            default_thinking_config = global_thinking_config
         self.default_thinking_config = default_thinking_config
         
         if default_max_tokens is None:
-            if self.full_model_name in GLOBAL_CONFIG.default_max_tokens:
-                default_max_tokens = GLOBAL_CONFIG.default_max_tokens[self.full_model_name]
+            default_max_tokens = global_max_tokens
         self.default_max_tokens = default_max_tokens
     
     @property
@@ -354,7 +404,7 @@ class BaseLLMClientAsync(ABC, utils.InheritDecoratorsMixin):
     @property
     def full_model_name(self) -> str:
         """Return the model identifier"""
-        return self.provider + ":" + self.model
+        return self._full_model_name
     
     @logfire_decorators.create_async
     @utils.retry_cls_async
@@ -434,6 +484,15 @@ class BaseLLMClientAsync(ABC, utils.InheritDecoratorsMixin):
         tool_choice_mode: Literal["ANY", "NONE"] = "NONE",
         autocomplete: bool = False,
     ):
+        if tool_choice_mode == "ANY":
+            tool_config = _TOOL_CFG_ANY
+        elif tool_choice_mode == "NONE":
+            tool_config = _TOOL_CFG_NONE
+        else:
+            tool_config = ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode))
+        if max_tokens is None:
+            max_tokens = self.default_max_tokens
+        
         if result_type == "tools":
             response = await self.create(
                 messages=messages,
@@ -442,7 +501,7 @@ class BaseLLMClientAsync(ABC, utils.InheritDecoratorsMixin):
                 system_message=system_message,
                 max_tokens=max_tokens,
                 tools=tools,
-                tool_config=ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode)),
+                tool_config=tool_config,
             )
             functions: list[FunctionCall] = []
             for candidate in response.candidates:
@@ -451,31 +510,20 @@ class BaseLLMClientAsync(ABC, utils.InheritDecoratorsMixin):
                         functions.append(part.function_call)
             return functions
 
-        response = await self.create(
-            messages=messages,
+        call_kwargs = dict(
             result_type=result_type,
             thinking_config=thinking_config,
             system_message=system_message,
             max_tokens=max_tokens,
             tools=tools,
-            tool_config=ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode)),
+            tool_config=tool_config,
         )
-
-        if max_tokens is None:
-            max_tokens = self.default_max_tokens
+        response = await self.create(messages=messages, **call_kwargs)
 
         while autocomplete and response.candidates and response.candidates[0].finish_reason not in [FinishReason.STOP, FinishReason.MAX_TOKENS]:
             BaseLLMClient._append_generated_part(messages, response)
 
-            response = await self.create(
-                messages=messages,
-                result_type=result_type,
-                thinking_config=thinking_config,
-                system_message=system_message,
-                max_tokens=max_tokens,
-                tools=tools,
-                tool_config=ToolConfig(function_calling_config=FunctionCallingConfig(mode=tool_choice_mode)),
-            )
+            response = await self.create(messages=messages, **call_kwargs)
 
         if result_type is None:
             return response.text
@@ -558,7 +606,7 @@ class BaseLLMClientAsync(ABC, utils.InheritDecoratorsMixin):
         tool_choice_mode: Literal["ANY", "NONE"] = "NONE",
     ):
         return await self.create_value(
-            messages=[Content(parts=[Part(text=prompt)], role="user")],
+            messages=[_wrap_user_prompt(prompt)],
             result_type=result_type,
             thinking_config=thinking_config,
             system_message=system_message,
@@ -567,13 +615,87 @@ class BaseLLMClientAsync(ABC, utils.InheritDecoratorsMixin):
             tool_choice_mode=tool_choice_mode,
         )
 
+    async def create_many(
+        self,
+        batches: list[list[Content]],
+        *,
+        max_concurrency: int = 50,
+        **kwargs,
+    ) -> list[Response]:
+        """Run create for every messages list concurrently, at most max_concurrency requests at a time"""
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def create_one(messages: list[Content]) -> Response:
+            async with semaphore:
+                return await self.create(messages, **kwargs)
+
+        return await asyncio.gather(*(create_one(messages) for messages in batches))
+
+    async def from_text_many(
+        self,
+        prompts: list[str],
+        result_type: ResultType | Literal["tools"] = None,
+        *,
+        max_concurrency: int = 50,
+        **kwargs,
+    ) -> list:
+        """Run from_text for every prompt concurrently, at most max_concurrency requests at a time"""
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def from_text_one(prompt: str):
+            async with semaphore:
+                return await self.from_text(prompt, result_type, **kwargs)
+
+        return await asyncio.gather(*(from_text_one(prompt) for prompt in prompts))
+
+
+class _ResponseLRU:
+    """
+    Bounded LRU of responses used by the cached clients.
+    Responses are deep-copied on the way in and out, so callers can mutate what they get back.
+    If max_size <= 0, nothing is stored.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._responses: OrderedDict[str, Response] = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._responses)
+    
+    def get(self, key: str) -> Response | None:
+        with self._lock:
+            response = self._responses.get(key)
+            if response is None:
+                return None
+            self._responses.move_to_end(key)
+        return response.model_copy(deep=True)
+    
+    def put(self, key: str, response: Response):
+        if self.max_size <= 0:
+            return
+        response = response.model_copy(deep=True)
+        with self._lock:
+            self._responses[key] = response
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
+
 
 class CachedLLMClient(BaseLLMClient):
     @property
     def api_key(self) -> ApiKey:
         return self.llm_client.api_key
 
-    def __init__(self, llm_client: BaseLLMClient, cache_dir: str = "data/llm_cache"):
+    def __init__(self, llm_client: BaseLLMClient, cache_dir: str = "data/llm_cache", mem_cache_size: int = 1024):
         super().__init__(
             provider=llm_client.provider,
             model=llm_client.model,
@@ -584,39 +706,63 @@ class CachedLLMClient(BaseLLMClient):
         self.provider = llm_client.provider
         self.llm_client = llm_client
         self.cache_dir = cache_dir
+        self._mem_cache = _ResponseLRU(mem_cache_size)
     
     def create(self, messages: list[Content], **kwargs) -> Response:
-        response, messages_dump, cache_path = CachedLLMClient.create_cached(self.llm_client, self.cache_dir, messages, **kwargs)
+        cache_path = CachedLLMClient.get_cache_path(self.llm_client, self.cache_dir, messages)
+        response = self._mem_cache.get(cache_path)
         if response is not None:
             return response
-        response = self.llm_client.create(messages, **kwargs)
-        CachedLLMClient.save_cache(cache_path, self.llm_client.full_model_name, messages_dump, response)
+        response = CachedLLMClient.load_cache(cache_path, self.llm_client.full_model_name, messages)
+        if response is None:
+            response = self.llm_client.create(messages, **kwargs)
+            CachedLLMClient.save_cache(cache_path, self.llm_client.full_model_name, messages, response)
+        self._mem_cache.put(cache_path, response)
         return response
 
     @staticmethod
-    def create_cached(llm_client: BaseLLMClient | BaseLLMClientAsync, cache_dir: str, messages: list[Content], **kwargs) -> tuple[Response | None, list[dict], str]:
-        messages_dump = [message.model_dump() for message in messages]
-        key = hashlib.sha256(
-            json.dumps((llm_client.full_model_name, messages_dump)).encode()
-        ).hexdigest()
-        cache_path = os.path.join(cache_dir, f"{key}.json")
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, "rt") as f:
-                    cache_data = json.load(f)
-                    if cache_data["full_model_name"] == llm_client.full_model_name and json.dumps(cache_data["request"]) == json.dumps(messages_dump):
-                        return Response(**cache_data["response"]), messages_dump, cache_path
-                    else:
-                        logger.debug(f"Cache mismatch for {key}")
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.warning(f"Invalid cache file {cache_path}: {str(e)}")
-                # Continue to make API call if cache is invalid
-        return None, messages_dump, cache_path
+    def get_cache_path(llm_client: BaseLLMClient | BaseLLMClientAsync, cache_dir: str, messages: list[Content]) -> str:
+        hasher = hashlib.blake2b(digest_size=32)
+        hasher.update(llm_client.full_model_name.encode())
+        for message in messages:
+            hasher.update(message.model_dump_json().encode())
+        return os.path.join(cache_dir, f"{hasher.hexdigest()}.json")
+    
+    @staticmethod
+    def load_cache(cache_path: str, full_model_name: str, messages: list[Content]) -> Response | None:
+        try:
+            with open(cache_path, "rb") as f:
+                cache_data = orjson.loads(f.read()) if orjson is not None else json.loads(f.read())
+                if cache_data["full_model_name"] == full_model_name and len(cache_data["request"]) == len(messages):
+                    return Response(**cache_data["response"])
+                else:
+                    logger.debug(f"Cache mismatch for {cache_path}")
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.warning(f"Invalid cache file {cache_path}: {str(e)}")
+            # Continue to make API call if cache is invalid
+        return None
     
     @staticmethod
-    def save_cache(cache_path: str, full_model_name: str, messages_dump: list[dict], response: Response):
-        with open(cache_path, 'wt') as f:
-            json.dump({"full_model_name": full_model_name, "request": messages_dump, "response": response.model_dump()}, f, indent=4)
+    def save_cache(cache_path: str, full_model_name: str, messages: list[Content], response: Response):
+        cache_data = {"full_model_name": full_model_name, "request": [message.model_dump(mode="json") for message in messages], "response": response.model_dump(mode="json")}
+        data = orjson.dumps(cache_data) if orjson is not None else json.dumps(cache_data).encode()
+        
+        # Write to a temporary file first so readers never see a partially written cache file
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        # The name is unique per process and thread, and open() keeps the usual umask-based file mode
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
 
 
 class CachedLLMClientAsync(BaseLLMClientAsync):
@@ -624,17 +770,22 @@ class CachedLLMClientAsync(BaseLLMClientAsync):
     def api_key(self) -> ApiKey:
         return self.llm_client.api_key
 
-    def __init__(self, llm_client: BaseLLMClientAsync, cache_dir: str = "data/llm_cache"):
+    def __init__(self, llm_client: BaseLLMClientAsync, cache_dir: str = "data/llm_cache", mem_cache_size: int = 1024):
         super().__init__(provider=llm_client.provider, model=llm_client.model, decorator_configs=llm_client._decorator_configs, default_max_tokens=llm_client.default_max_tokens)
         self.provider = llm_client.provider
         self.llm_client = llm_client
         self.cache_dir = cache_dir
+        self._mem_cache = _ResponseLRU(mem_cache_size)
     
     async def create(self, messages: list[Content], **kwargs) -> Response:
-        response, messages_dump, cache_path = CachedLLMClient.create_cached(self.llm_client, self.cache_dir, messages, **kwargs)
+        cache_path = CachedLLMClient.get_cache_path(self.llm_client, self.cache_dir, messages)
+        response = self._mem_cache.get(cache_path)
         if response is not None:
-            return response        
-        response = await self.llm_client.create(messages, **kwargs)
-        CachedLLMClient.save_cache(cache_path, self.llm_client.full_model_name, messages_dump, response)
+            return response
+        # disk I/O runs in a worker thread to keep the event loop free
+        response = await asyncio.to_thread(CachedLLMClient.load_cache, cache_path, self.llm_client.full_model_name, messages)
+        if response is None:
+            response = await self.llm_client.create(messages, **kwargs)
+            await asyncio.to_thread(CachedLLMClient.save_cache, cache_path, self.llm_client.full_model_name, messages, response)
+        self._mem_cache.put(cache_path, response)
         return response
-
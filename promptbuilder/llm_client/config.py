@@ -22,4 +22,6 @@ class LlmClientConfigs:
 
 # The global config is the single global object in promptbuilder.llm_client
 # It also does not initialize anything when it's created
+# Clients cache the per-model defaults, so change it through promptbuilder.llm_client.configure()
+# or call promptbuilder.llm_client.clear_defaults_cache() after changing it directly
 GLOBAL_CONFIG = LlmClientConfigs()
@@ -2,7 +2,7 @@ import warnings
 from itertools import chain
 
 from promptbuilder.llm_client.types import ApiKey, Model, ThinkingConfig
-from promptbuilder.llm_client.base_client import BaseLLMClient, BaseLLMClientAsync
+from promptbuilder.llm_client.base_client import BaseLLMClient, BaseLLMClientAsync, clear_defaults_cache
 from promptbuilder.llm_client.config import GLOBAL_CONFIG
 from promptbuilder.llm_client.utils import DecoratorConfigs
 from promptbuilder.llm_client.google_client import GoogleLLMClient, GoogleLLMClientAsync
@@ -173,6 +173,8 @@ def configure(
     
     if use_logfire is not None:
         GLOBAL_CONFIG.use_logfire = use_logfire
+    
+    clear_defaults_cache()
 
 def sync_existing_clients_with_global_config():
     for full_model_name, llm_client in chain(_memory.items(), _memory_async.items()):
@@ -1,6 +1,7 @@
 import time
 import asyncio
 import logging
+import threading
 import traceback
 from functools import wraps
 from typing import Callable, Awaitable, ParamSpec, TypeVar
@@ -121,6 +122,62 @@ def retry_cls_async(class_method: Callable[P, Awaitable[T]]) -> Callable[P, Awai
     return wrapper
 
     
+class TokenBucket:
+    """
+    Rate limiter that hands out at most `rpm_limit` permits per minute, evenly spaced in time.
+    Permits are reserved in call order, so concurrent callers wait for their slot instead of polling.
+    :param rpm_limit: maximum number of permits per minute, must be > 0
+    """
+    def __init__(self, rpm_limit: int):
+        if rpm_limit <= 0:
+            raise ValueError(f"rpm_limit must be > 0, got {rpm_limit}")
+        self.rpm_limit = rpm_limit
+        self._interval = 60 / rpm_limit
+        self._next_free_time = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self, n: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            start_time = max(now, self._next_free_time)
+            self._next_free_time = start_time + n * self._interval
+            return start_time - now
+    
+    def acquire_sync(self, n: int = 1):
+        delay = self._reserve(n)
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def acquire(self, n: int = 1):
+        delay = self._reserve(n)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_rpm_bucket_lock = threading.Lock()
+
+
+def _get_rpm_bucket(self) -> TokenBucket | None:
+    if not hasattr(self, "_decorator_configs"):
+        self._decorator_configs = DecoratorConfigs()
+    if self._decorator_configs.rpm_limit is None:
+        self._decorator_configs.rpm_limit = RpmLimitConfig()
+    
+    rpm_limit = self._decorator_configs.rpm_limit.rpm_limit
+    if rpm_limit <= 0:
+        return None
+    
+    bucket = getattr(self, "_rpm_bucket", None)
+    if bucket is None or bucket.rpm_limit != rpm_limit:
+        # the bucket is created lazily, so concurrent first calls must agree on a single instance
+        with _rpm_bucket_lock:
+            bucket = getattr(self, "_rpm_bucket", None)
+            if bucket is None or bucket.rpm_limit != rpm_limit:
+                bucket = TokenBucket(rpm_limit)
+                self._rpm_bucket = bucket
+    return bucket
+
+
 @inherited_decorator
 def rpm_limit_cls(class_method: Callable[P, T]) -> Callable[P, T]:
     """
@@ -130,25 +187,10 @@ def rpm_limit_cls(class_method: Callable[P, T]) -> Callable[P, T]:
     """
     @wraps(class_method)
     def wrapper(self, *args, **kwargs):
-        if not hasattr(self, "_decorator_configs"):
-            self._decorator_configs = DecoratorConfigs()
-        if self._decorator_configs.rpm_limit is None:
-            self._decorator_configs.rpm_limit = RpmLimitConfig()
-        
-        if self._decorator_configs.rpm_limit.rpm_limit <= 0:
-            return class_method(self, *args, **kwargs)
-        
-        if not hasattr(self, "_last_request_time"):
-            self._last_request_time = time.time() - 60 / self._decorator_configs.rpm_limit.rpm_limit
-        
-        while True:
-            if time.time() - self._last_request_time < 60 / self._decorator_configs.rpm_limit.rpm_limit:
-                diff = 60 / self._decorator_configs.rpm_limit.rpm_limit - (time.time() - self._last_request_time)
-                time.sleep(diff)
-                continue
-            
-            self._last_request_time = time.time()
-            return class_method(self, *args, **kwargs)
+        bucket = _get_rpm_bucket(self)
+        if bucket is not None:
+            bucket.acquire_sync()
+        return class_method(self, *args, **kwargs)
     return wrapper
 
 
@@ -161,23 +203,8 @@ def rpm_limit_cls_async(class_method: Callable[P, Awaitable[T]]) -> Callable[P,
     """
     @wraps(class_method)
     async def wrapper(self, *args, **kwargs):
-        if not hasattr(self, "_decorator_configs"):
-            self._decorator_configs = DecoratorConfigs()
-        if self._decorator_configs.rpm_limit is None:
-            self._decorator_configs.rpm_limit = RpmLimitConfig()
-        
-        if self._decorator_configs.rpm_limit.rpm_limit <= 0:
-            return await class_method(self, *args, **kwargs)
-        
-        if not hasattr(self, "_last_request_time"):
-            self._last_request_time = time.time() - 60 / self._decorator_configs.rpm_limit.rpm_limit
-        
-        while True:
-            if time.time() - self._last_request_time < 60 / self._decorator_configs.rpm_limit.rpm_limit:
-                diff = 60 / self._decorator_configs.rpm_limit.rpm_limit - (time.time() - self._last_request_time)
-                await asyncio.sleep(diff)
-                continue
-            
-            self._last_request_time = time.time()
-            return await class_method(self, *args, **kwargs)
+        bucket = _get_rpm_bucket(self)
+        if bucket is not None:
+            await bucket.acquire()
+        return await class_method(self, *args, **kwargs)
     return wrapper
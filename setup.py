@@ -13,6 +13,9 @@ setup(
         "openai",
         "aioboto3"
     ],
+    extras_require={
+        "fast": ["orjson"],
+    },
     author="Kapulkin Stanislav",
     author_email="kapulkin@gmail.com",
     description="Library for building prompts for LLMs",
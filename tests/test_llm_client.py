@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch
-from promptbuilder.llm_client import CachedLLMClient
+from promptbuilder.llm_client import BaseLLMClient, CachedLLMClient, configure, clear_defaults_cache
+from promptbuilder.llm_client.config import GLOBAL_CONFIG
 from promptbuilder.llm_client.aisuite_client import AiSuiteLLMClient
 from promptbuilder.llm_client.types import Completion, Choice, Message, Usage, Response, Candidate, Content, Part, UsageMetadata
 import json
@@ -135,6 +136,96 @@ def test_create_invalid_json_raises_error(llm_client):
         with pytest.raises(ValueError):
             llm_client.create_value(messages, result_type="json")
 
+def test_create_value_uses_default_max_tokens(mock_aisuite_client):
+    llm_client = AiSuiteLLMClient(full_model_name="test:model", api_key="test-key", default_max_tokens=123)
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    llm_client.create_value(messages)
+    
+    mock_create = mock_aisuite_client.return_value.chat.completions.create
+    assert mock_create.call_args_list[0].kwargs["max_tokens"] == 123
+
+def test_configure_updates_defaults_for_new_clients(mock_aisuite_client):
+    # The first client caches the per-model defaults, configure() must invalidate them
+    assert AiSuiteLLMClient(full_model_name="test:model", api_key="test-key").default_max_tokens is None
+    try:
+        configure(update_max_tokens={"test:model": 321})
+        llm_client = AiSuiteLLMClient(full_model_name="test:model", api_key="test-key")
+        assert llm_client.default_max_tokens == 321
+    finally:
+        GLOBAL_CONFIG.default_max_tokens.pop("test:model", None)
+        clear_defaults_cache()
+
+def test_append_generated_part_without_candidates():
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    with pytest.raises(ValueError):
+        BaseLLMClient._append_generated_part(messages, Response(candidates=None))
+
+def test_append_generated_part_without_content():
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    with pytest.raises(ValueError):
+        BaseLLMClient._append_generated_part(messages, Response(candidates=[Candidate(content=None)]))
+
+def _response_with_parts(parts: list[Part]) -> Response:
+    return Response(candidates=[Candidate(content=Content(parts=parts, role="model"))])
+
+def test_append_generated_part_prefers_text_over_thought():
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    response = _response_with_parts([
+        Part(text="thinking", thought=True),
+        Part(text="Hello, "),
+        Part(text="world"),
+    ])
+    BaseLLMClient._append_generated_part(messages, response)
+    
+    assert len(messages) == 2
+    assert messages[-1].role == "model"
+    assert messages[-1].parts[-1].text == "Hello, world"
+    assert messages[-1].parts[-1].thought is False
+
+def test_append_generated_part_thought_only():
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    response = _response_with_parts([
+        Part(text="first ", thought=True),
+        Part(text="second", thought=True),
+    ])
+    BaseLLMClient._append_generated_part(messages, response)
+    
+    assert messages[-1].parts[-1].text == "first second"
+    assert messages[-1].parts[-1].thought is True
+
+def test_append_generated_part_empty_text_wins_over_thought():
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    response = _response_with_parts([
+        Part(text="thinking", thought=True),
+        Part(text=""),
+    ])
+    BaseLLMClient._append_generated_part(messages, response)
+    
+    assert messages[-1].parts[-1].text == ""
+    assert messages[-1].parts[-1].thought is False
+
+def test_append_generated_part_empty_thoughts_only():
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    response = _response_with_parts([Part(text="", thought=True)])
+    with pytest.raises(ValueError):
+        BaseLLMClient._append_generated_part(messages, response)
+
+def test_append_generated_part_extends_trailing_model_message():
+    messages = [
+        Content(parts=[Part(text="Test message")], role="user"),
+        Content(parts=[Part(text="Hello, ", thought=False)], role="model"),
+    ]
+    response = _response_with_parts([Part(text="world")])
+    BaseLLMClient._append_generated_part(messages, response)
+    
+    assert len(messages) == 2
+    assert len(messages[-1].parts) == 1
+    assert messages[-1].parts[-1].text == "Hello, world"
+
+def test_as_json_control_characters():
+    # Raw newlines inside strings are rejected by strict parsing and handled by the lenient fallback
+    assert BaseLLMClient.as_json('{"key": "line1\nline2"}') == {"key": "line1\nline2"}
+
 @pytest.fixture
 def temp_cache_dir():
     # Create a temporary directory for cache
@@ -217,6 +308,9 @@ def test_cached_llm_client_invalid_cache_file(cached_llm_client, mock_aisuite_cl
     with open(cache_path, 'w') as f:
         f.write('invalid json')
     
+    # Drop the in-memory layer so the next call goes to disk
+    cached_llm_client._mem_cache.clear()
+    
     # Reset mock to verify new API call is made
     mock_client = mock_aisuite_client.return_value
     mock_client.chat.completions.create.reset_mock()
@@ -226,4 +320,83 @@ def test_cached_llm_client_invalid_cache_file(cached_llm_client, mock_aisuite_cl
     
     # Verify new API call was made
     mock_client.chat.completions.create.assert_called_once()
-    assert isinstance(response, Response)
\ No newline at end of file
+    assert isinstance(response, Response)
+
+def test_cached_llm_client_memory_hit(cached_llm_client, mock_aisuite_client):
+    """Test that repeated calls are served from memory without reading the cache file"""
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    
+    first_response = cached_llm_client.create(messages)
+    
+    # Remove the cache file so only the in-memory layer can serve the request
+    for cache_file in os.listdir(cached_llm_client.cache_dir):
+        os.remove(os.path.join(cached_llm_client.cache_dir, cache_file))
+    
+    mock_client = mock_aisuite_client.return_value
+    mock_client.chat.completions.create.reset_mock()
+    
+    second_response = cached_llm_client.create(messages)
+    
+    assert second_response.candidates[0].content.parts[0].text == first_response.candidates[0].content.parts[0].text
+    mock_client.chat.completions.create.assert_not_called()
+
+def test_cached_llm_client_disk_hit(cached_llm_client, mock_aisuite_client):
+    """Test that a response is read back from the cache file when it is not in memory"""
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    
+    first_response = cached_llm_client.create(messages)
+    
+    # Drop the in-memory layer so the next call has to read the cache file
+    cached_llm_client._mem_cache.clear()
+    mock_client = mock_aisuite_client.return_value
+    mock_client.chat.completions.create.reset_mock()
+    
+    second_response = cached_llm_client.create(messages)
+    
+    assert isinstance(second_response, Response)
+    assert second_response.candidates[0].content.parts[0].text == first_response.candidates[0].content.parts[0].text
+    assert second_response.usage_metadata.total_token_count == first_response.usage_metadata.total_token_count
+    mock_client.chat.completions.create.assert_not_called()
+
+def test_cached_llm_client_memory_hit_returns_copy(cached_llm_client, mock_aisuite_client):
+    """Test that mutating a returned response does not change what the cache returns later"""
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    
+    first_response = cached_llm_client.create(messages)
+    first_response.candidates[0].content.parts[0].text += "X"
+    
+    second_response = cached_llm_client.create(messages)
+    second_response.candidates[0].content.parts[0].text += "Y"
+    
+    third_response = cached_llm_client.create(messages)
+    assert third_response.candidates[0].content.parts[0].text == "This is a test response"
+
+def test_cached_llm_client_memory_cache_disabled(llm_client, temp_cache_dir, mock_aisuite_client):
+    """Test that mem_cache_size=0 turns off the in-memory layer"""
+    cached_llm_client = CachedLLMClient(llm_client, cache_dir=temp_cache_dir, mem_cache_size=0)
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    
+    cached_llm_client.create(messages)
+    cached_llm_client.create(messages)
+    
+    assert len(cached_llm_client._mem_cache) == 0
+    mock_aisuite_client.return_value.chat.completions.create.assert_called_once()
+
+def test_cached_llm_client_creates_missing_cache_dir(llm_client, temp_cache_dir, mock_aisuite_client):
+    """Test that the cache directory is created and the cache file is published with the umask-based mode"""
+    cache_dir = os.path.join(temp_cache_dir, "nested", "cache")
+    cached_llm_client = CachedLLMClient(llm_client, cache_dir=cache_dir)
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    
+    cached_llm_client.create(messages)
+    
+    # Only the final file is left, no temporary files
+    cache_files = os.listdir(cache_dir)
+    assert len(cache_files) == 1
+    assert cache_files[0].endswith('.json')
+    
+    if os.name == "posix":
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = os.stat(os.path.join(cache_dir, cache_files[0])).st_mode & 0o777
+        assert mode == 0o666 & ~umask
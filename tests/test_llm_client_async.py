@@ -174,6 +174,62 @@ async def test_create_with_system_message(llm_client):
     assert len(response.candidates) == 1
     assert response.candidates[0].content.parts[0].text == "This is a test response" 
 
+@pytest.mark.asyncio
+async def test_create_value_uses_default_max_tokens(mock_aisuite_client):
+    llm_client = AiSuiteLLMClientAsync(full_model_name="test:model", api_key="test-key", default_max_tokens=123)
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    await llm_client.create_value(messages)
+    
+    mock_create = mock_aisuite_client.return_value.chat.completions.create
+    assert mock_create.call_args_list[0].kwargs["max_tokens"] == 123
+
+@pytest.mark.asyncio
+async def test_create_many(llm_client, mock_aisuite_client):
+    batches = [[Content(parts=[Part(text=f"Test message {i}")], role="user")] for i in range(5)]
+    responses = await llm_client.create_many(batches, max_concurrency=2)
+    
+    assert len(responses) == 5
+    for response in responses:
+        assert isinstance(response, Response)
+        assert response.candidates[0].content.parts[0].text == "This is a test response"
+    assert mock_aisuite_client.return_value.chat.completions.create.call_count == 5
+
+@pytest.mark.asyncio
+async def test_create_many_respects_max_concurrency(llm_client, mock_aisuite_client):
+    completion = await mock_aisuite_client.return_value.chat.completions.create()
+    in_flight = 0
+    peak_in_flight = 0
+    
+    async def create(**kwargs):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return completion
+    
+    mock_aisuite_client.return_value.chat.completions.create = AsyncMock(side_effect=create)
+    batches = [[Content(parts=[Part(text=f"Test message {i}")], role="user")] for i in range(6)]
+    responses = await llm_client.create_many(batches, max_concurrency=2)
+    
+    assert len(responses) == 6
+    assert peak_in_flight == 2
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_concurrency", [0, -1])
+async def test_create_many_invalid_max_concurrency(llm_client, max_concurrency):
+    batches = [[Content(parts=[Part(text="Test message")], role="user")]]
+    with pytest.raises(ValueError):
+        await llm_client.create_many(batches, max_concurrency=max_concurrency)
+    with pytest.raises(ValueError):
+        await llm_client.from_text_many(["Test message"], max_concurrency=max_concurrency)
+
+@pytest.mark.asyncio
+async def test_from_text_many(llm_client):
+    responses = await llm_client.from_text_many(["First prompt", "Second prompt"])
+    
+    assert responses == ["This is a test response", "This is a test response"]
+
 @pytest.fixture
 def temp_cache_dir():
     # Create a temporary directory for cache
@@ -207,4 +263,23 @@ async def test_cached_llm_client_first_call(cached_llm_client, mock_aisuite_clie
     # Verify cache file was created
     cache_files = os.listdir(cached_llm_client.cache_dir)
     assert len(cache_files) == 1
-    assert cache_files[0].endswith('.json')
\ No newline at end of file
+    assert cache_files[0].endswith('.json')
+
+@pytest.mark.asyncio
+async def test_cached_llm_client_disk_hit(cached_llm_client, mock_aisuite_client):
+    """Test that a response is read back from the cache file when it is not in memory"""
+    messages = [Content(parts=[Part(text="Test message")], role="user")]
+    
+    first_response = await cached_llm_client.create(messages)
+    
+    # Drop the in-memory layer so the next call has to read the cache file
+    cached_llm_client._mem_cache.clear()
+    mock_client = mock_aisuite_client.return_value
+    mock_client.chat.completions.create.reset_mock()
+    
+    second_response = await cached_llm_client.create(messages)
+    
+    assert isinstance(second_response, Response)
+    assert second_response.candidates[0].content.parts[0].text == first_response.candidates[0].content.parts[0].text
+    assert second_response.usage_metadata.total_token_count == first_response.usage_metadata.total_token_count
+    mock_client.chat.completions.create.assert_not_called()
@@ -0,0 +1,93 @@
+import pytest
+import time
+import asyncio
+import threading
+from promptbuilder.llm_client.utils import TokenBucket, DecoratorConfigs, RpmLimitConfig, rpm_limit_cls, rpm_limit_cls_async
+
+
+class RateLimitedClient:
+    def __init__(self, rpm_limit: int):
+        self._decorator_configs = DecoratorConfigs(rpm_limit=RpmLimitConfig(rpm_limit=rpm_limit))
+        self.call_times = []
+    
+    @rpm_limit_cls
+    def call(self):
+        self.call_times.append(time.monotonic())
+    
+    @rpm_limit_cls_async
+    async def call_async(self, index: int):
+        self.call_times.append((index, time.monotonic()))
+
+
+def test_token_bucket_acquire_sync_spacing():
+    # 600 rpm means one permit every 0.1 seconds, the first one is immediate
+    bucket = TokenBucket(600)
+    
+    times = []
+    for _ in range(3):
+        bucket.acquire_sync()
+        times.append(time.monotonic())
+    
+    assert times[1] - times[0] >= 0.09
+    assert times[2] - times[1] >= 0.09
+    assert times[2] - times[0] < 1.0
+
+@pytest.mark.asyncio
+async def test_token_bucket_acquire_concurrent_order():
+    bucket = TokenBucket(600)
+    acquired = []
+    
+    async def acquire(index: int):
+        await bucket.acquire()
+        acquired.append((index, time.monotonic()))
+    
+    start = time.monotonic()
+    await asyncio.gather(*(acquire(i) for i in range(3)))
+    
+    # Reservations are served in call order and spaced by the interval
+    assert [index for index, _ in acquired] == [0, 1, 2]
+    assert acquired[1][1] - acquired[0][1] >= 0.09
+    assert acquired[2][1] - acquired[1][1] >= 0.09
+    assert acquired[2][1] - start < 1.0
+
+@pytest.mark.parametrize("rpm_limit", [0, -1])
+def test_token_bucket_invalid_rpm_limit(rpm_limit):
+    with pytest.raises(ValueError):
+        TokenBucket(rpm_limit)
+
+def test_rpm_limit_cls_spacing_across_threads():
+    # 1200 rpm means one call every 0.05 seconds, even when threads hit a fresh client at once
+    client = RateLimitedClient(1200)
+    barrier = threading.Barrier(6)
+    
+    def call():
+        barrier.wait()
+        client.call()
+    
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    times = sorted(client.call_times)
+    assert len(times) == 6
+    assert all(later - earlier >= 0.04 for earlier, later in zip(times, times[1:]))
+
+@pytest.mark.asyncio
+async def test_rpm_limit_cls_async_order_and_spacing():
+    client = RateLimitedClient(600)
+    await asyncio.gather(*(client.call_async(i) for i in range(3)))
+    
+    assert [index for index, _ in client.call_times] == [0, 1, 2]
+    times = [call_time for _, call_time in client.call_times]
+    assert all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:]))
+
+def test_rpm_limit_cls_no_limit():
+    client = RateLimitedClient(0)
+    start = time.monotonic()
+    for _ in range(3):
+        client.call()
+    
+    assert len(client.call_times) == 3
+    assert time.monotonic() - start < 0.05